@@ -1,21 +1,28 @@
 # Import necessary libraries
-from flask import Flask, render_template, request, redirect, url_for, g, make_response, session
+from flask import Flask, render_template, request, redirect, url_for, g, make_response, session, Response, stream_with_context
 from flask_httpauth import HTTPBasicAuth
 import sqlite3
-from datetime import datetime, timedelta
-import pytz # Library to handle timezones
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo # Standard library timezone support
 import csv
-import io
 import secrets
 import hashlib
-from functools import wraps
+import hmac
+from collections import deque
+from functools import lru_cache, wraps
+from itertools import groupby
+from operator import itemgetter
 import requests
+from requests.adapters import HTTPAdapter
 import threading
+import time
+import queue
 import json
 
 # --- Configuration ---
 
 import os
+from pathlib import Path
 try:
     # Try to import local config file
     from config import USERNAME, PASSWORD, DATABASE_PATH, TIMEZONE_NAME, SECRET_KEY, DEBUG as CONFIG_DEBUG, PORT, HOST,\
@@ -23,7 +30,7 @@ try:
     DATABASE = os.getenv('DATABASE', DATABASE_PATH)
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', TELEGRAM_BOT_TOKEN)
     TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', TELEGRAM_CHAT_ID)
-    TIMEZONE = pytz.timezone(TIMEZONE_NAME)
+    TIMEZONE = ZoneInfo(TIMEZONE_NAME)
     APP_PORT = int(os.getenv('PORT', PORT))
     APP_HOST = os.getenv('HOST', HOST)
 except ImportError:
@@ -33,7 +40,7 @@ except ImportError:
     DATABASE = os.getenv('DATABASE', 'attendance.db')
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
     TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '')
-    TIMEZONE = pytz.timezone(os.getenv('TIMEZONE', 'Europe/Prague'))
+    TIMEZONE = ZoneInfo(os.getenv('TIMEZONE', 'Europe/Prague'))
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     CONFIG_DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     APP_PORT = int(os.getenv('PORT', '5000'))
@@ -48,11 +55,20 @@ auth = HTTPBasicAuth()
 
 # --- Security ---
 
+# Credentials encoded once for constant-time comparison
+_USERNAME_BYTES = USERNAME.encode()
+_PASSWORD_BYTES = PASSWORD.encode()
+
 # This function defines the simple authentication logic (kept for compatibility)
 @auth.verify_password
 def verify_password(username, password):
     """Verifies the provided username and password."""
-    if username == USERNAME and password == PASSWORD:
+    if username is None or password is None:
+        return None
+    # Compare both values in constant time so neither leaks timing information
+    username_ok = hmac.compare_digest(username.encode(), _USERNAME_BYTES)
+    password_ok = hmac.compare_digest(password.encode(), _PASSWORD_BYTES)
+    if username_ok and password_ok:
         return username
     return None
 
@@ -62,57 +78,94 @@ def generate_auth_token():
     """Generate a secure random token for authentication."""
     return secrets.token_urlsafe(32)
 
+@lru_cache(maxsize=1024)
 def hash_token(token):
-    """Create a hash of the token for secure storage."""
+    """Create a hash of the token for secure storage (memoized for the live session tokens)."""
     return hashlib.sha256(token.encode()).hexdigest()
 
+AUTH_TOKEN_PRUNE_INTERVAL = 1000  # token creations between cleanups
+
 def create_auth_token():
     """Create and store a new authentication token."""
     token = generate_auth_token()
     token_hash = hash_token(token)
     
     # Store token in database with expiration (e.g., 365 days)
-    db = get_db()
-    expiry_date = datetime.now(TIMEZONE) + timedelta(days=365)
-    
-    # Initialize auth_tokens table if it doesn't exist
-    db.execute('''CREATE TABLE IF NOT EXISTS auth_tokens (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        token_hash TEXT UNIQUE NOT NULL,
-        created_at TEXT NOT NULL,
-        expires_at TEXT NOT NULL,
-        is_active INTEGER DEFAULT 1
-    )''')
-    
-    db.execute(
+    db = get_write_db()
+    now = g.now
+    expiry_date = now + timedelta(days=365)
+    
+    # The auth_tokens table is created by init_db() (schema.sql).
+    # BEGIN IMMEDIATE takes the write lock up front: one transaction, one sync.
+    db.execute('BEGIN IMMEDIATE')
+    cursor = db.execute(
         'INSERT INTO auth_tokens (token_hash, created_at, expires_at) VALUES (?, ?, ?)',
-        (token_hash, datetime.now(TIMEZONE).isoformat(), expiry_date.isoformat())
+        (token_hash, now.isoformat(), int(expiry_date.timestamp()))
     )
+    
+    # Every AUTH_TOKEN_PRUNE_INTERVAL-th token also prunes expired and revoked ones
+    if cursor.lastrowid % AUTH_TOKEN_PRUNE_INTERVAL == 0:
+        db.execute(
+            'DELETE FROM auth_tokens WHERE CAST(expires_at AS INTEGER) < ? OR is_active = 0',
+            (int(now.timestamp()),)
+        )
     db.commit()
     
     return token
 
+# Tokens recently validated against the database, so authenticated requests
+# usually skip the SQLite lookup. Cleared when tokens are invalidated; the TTL
+# bounds how long another worker process may keep accepting a revoked token.
+AUTH_CACHE_TTL = 300  # seconds
+AUTH_CACHE_SIZE = 1024
+_auth_cache = {}  # token hash -> monotonic time until which it is trusted
+_auth_cache_lock = threading.Lock()
+
+def forget_auth_token(token):
+    """Drops a single token from the validation cache."""
+    with _auth_cache_lock:
+        _auth_cache.pop(hash_token(token), None)
+
 def validate_auth_token(token):
     """Validate if the provided token is valid and not expired."""
     if not token:
         return False
     
     token_hash = hash_token(token)
+    now = time.monotonic()
+    
+    with _auth_cache_lock:
+        valid_until = _auth_cache.get(token_hash)
+    if valid_until is not None and valid_until > now:
+        return True
+    
     db = get_db()
     
-    # Check if token exists and is not expired
+    # Check if token exists and is not expired. The CAST fails closed on ISO expiry
+    # strings init_db() has not converted yet: they cast to their year, far below any epoch.
     result = db.execute('''
         SELECT id FROM auth_tokens 
-        WHERE token_hash = ? AND is_active = 1 AND datetime(expires_at) > datetime(?)
-    ''', (token_hash, datetime.now(TIMEZONE).isoformat())).fetchone()
+        WHERE token_hash = ? AND is_active = 1 AND CAST(expires_at AS INTEGER) > ?
+    ''', (token_hash, int(g.now.timestamp()))).fetchone()
     
-    return result is not None
+    if result is None:
+        return False
+    
+    with _auth_cache_lock:
+        if len(_auth_cache) >= AUTH_CACHE_SIZE:
+            _auth_cache.clear()
+        _auth_cache[token_hash] = now + AUTH_CACHE_TTL
+    
+    return True
 
 def invalidate_all_tokens():
     """Invalidate all authentication tokens (for logout all)."""
-    db = get_db()
+    db = get_write_db()
     db.execute('UPDATE auth_tokens SET is_active = 0')
     db.commit()
+    
+    with _auth_cache_lock:
+        _auth_cache.clear()
 
 def login_required(f):
     """Custom decorator to check for valid authentication token in cookies."""
@@ -130,268 +183,508 @@ def login_required(f):
 
 # --- Telegram Notifications ---
 
-def _send_telegram_message_async(employee_name, action, timestamp):
-    """Internal function to send Telegram message in background thread."""
+# Keep-alive session so notifications reuse the TCP/TLS connection to Telegram
+TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+_telegram_session = requests.Session()
+_telegram_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# Notifications are sent by one background worker from a bounded queue, so a
+# burst of clicks neither spawns a thread each nor exceeds Telegram's limits
+TELEGRAM_MAX_PER_SECOND = 25  # Telegram allows about 30 messages/second per bot
+TELEGRAM_QUEUE_SIZE = 1000
+_telegram_queue = queue.Queue(maxsize=TELEGRAM_QUEUE_SIZE)
+_telegram_worker = None
+_telegram_worker_lock = threading.Lock()
+
+def _send_telegram_message(employee_name, action, timestamp):
+    """
+    Internal function to send one Telegram message.
+    Returns the number of seconds to wait before retrying when rate limited, otherwise 0.
+    """
     try:
-        # Format timestamp
-        dt = datetime.strptime(f"{timestamp['date']} {timestamp['time']}", "%Y-%m-%d %H:%M:%S")
-        formatted_time = dt.strftime("%d.%m.%Y %H:%M")
+        # Format timestamp ("YYYY-MM-DD", "HH:MM:SS" -> "DD.MM.YYYY HH:MM") by slicing
+        day, time_of_day = timestamp['date'], timestamp['time']
+        formatted_time = f"{day[8:10]}.{day[5:7]}.{day[0:4]} {time_of_day[0:5]}"
         
         # Create message
         action_text = "příchod" if action == "in" else "odchod"
         message = f"{employee_name}:\n {formatted_time} - {action_text}"
         
         # Send to Telegram
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
             'chat_id': TELEGRAM_CHAT_ID,
             'text': message,
             'parse_mode': 'Markdown'
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = _telegram_session.post(TELEGRAM_API_URL, json=payload, timeout=10)
         if response.status_code == 200:
             pass
+        elif response.status_code == 429:
+            # Too many requests - Telegram says how long to back off
+            return response.json().get('parameters', {}).get('retry_after', 1)
         else:
             print(f"Failed to send Telegram notification: {response.status_code} - {response.text}")
             
     except Exception as e:
         print(f"Error sending Telegram notification: {e}")
+    
+    return 0
+
+def _telegram_worker_loop():
+    """Drains the notification queue at a bounded rate, backing off when Telegram asks to."""
+    while True:
+        item = _telegram_queue.get()
+        retry_after = _send_telegram_message(*item)
+        if retry_after:
+            time.sleep(retry_after)
+            _send_telegram_message(*item)
+        time.sleep(1 / TELEGRAM_MAX_PER_SECOND)
 
 def send_telegram_notification(employee_name, action, timestamp):
     """Send notification to Telegram group asynchronously if token and chat ID are configured."""
+    global _telegram_worker
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         return  # Skip if Telegram is not configured
     
-    # Start background thread for Telegram notification
-    telegram_thread = threading.Thread(
-        target=_send_telegram_message_async,
-        args=(employee_name, action, timestamp),
-        daemon=True  # Thread will die when main program exits
+    # Start the worker on first use (in the serving process, not before a fork)
+    with _telegram_worker_lock:
+        if _telegram_worker is None:
+            _telegram_worker = threading.Thread(
+                target=_telegram_worker_loop,
+                daemon=True  # Thread will die when main program exits
+            )
+            _telegram_worker.start()
+    
+    try:
+        _telegram_queue.put_nowait((employee_name, action, timestamp))
+    except queue.Full:
+        print(f"Telegram notification dropped, queue is full: {employee_name} {action}")
+
+# --- SQL Statements ---
+# Kept as module constants so every request hands sqlite3 the identical string
+# and hits its prepared-statement cache instead of re-parsing.
+
+_SQL_ALL_EMPLOYEES = 'SELECT id, name, is_active FROM employees ORDER BY name'
+
+_SQL_EMPLOYEE_LAST_STATUS = '''
+    SELECT e.id, e.name,
+           (SELECT status FROM attendance
+            WHERE employee_id = e.id AND timestamp >= ? AND timestamp < ?
+            ORDER BY timestamp DESC LIMIT 1) AS last_status
+    FROM employees e
+    WHERE e.name = ? AND e.is_active = 1
+'''
+
+# Resolves the active employee and records the action in a single statement
+_SQL_INSERT_ATTENDANCE = '''
+    INSERT INTO attendance (employee_id, status, timestamp)
+    SELECT id, ?, ? FROM employees WHERE name = ? AND is_active = 1
+'''
+
+# Base query for reports and exports; callers append filters and ORDER BY.
+# Date and time are sliced from the stored local timestamp (date()/time() would convert
+# to UTC), so the labels agree with the local range filter.
+_SQL_ATTENDANCE_REPORT = '''
+    SELECT e.name as employee_name, a.status, 
+           substr(a.timestamp, 1, 10) as date, 
+           substr(a.timestamp, 12, 8) as time
+    FROM attendance a 
+    JOIN employees e ON a.employee_id = e.id 
+    WHERE a.timestamp >= ? AND a.timestamp < ?
+'''
+
+# Ordering expected by calculate_entry_exit_pairs(), so it never has to sort
+_SQL_ORDER_FOR_PAIRS = ' ORDER BY e.name, date, time, a.timestamp'
+
+# Worked minutes per employee and day. Each Leave is paired with the Enter
+# immediately preceding it on the same day; unmatched records count as zero.
+# Window functions require SQLite 3.25+.
+_SQL_DAILY_MINUTES = '''
+    SELECT employee_name, date,
+           SUM(CASE WHEN status = 'Leave' AND prev_status = 'Enter'
+                    THEN minutes - prev_minutes ELSE 0 END) AS total_minutes
+    FROM (
+        SELECT employee_name, date, status, minutes,
+               LAG(status) OVER day AS prev_status,
+               LAG(minutes) OVER day AS prev_minutes
+        FROM (
+            SELECT e.name as employee_name, a.status, a.id,
+                   substr(a.timestamp, 1, 10) as date,
+                   substr(a.timestamp, 12, 8) as time,
+                   CAST(substr(a.timestamp, 12, 2) AS INTEGER) * 60 +
+                   CAST(substr(a.timestamp, 15, 2) AS INTEGER) as minutes
+            FROM attendance a 
+            JOIN employees e ON a.employee_id = e.id 
+            WHERE a.timestamp >= ? AND a.timestamp < ?
+              AND (? IS NULL OR e.name = ?)
+        )
+        WINDOW day AS (PARTITION BY employee_name, date ORDER BY time, id)
     )
-    telegram_thread.start()
+    GROUP BY employee_name, date
+    ORDER BY employee_name, date
+'''
 
 # --- Database Functions ---
 
+def date_range_bounds(start_date, end_date):
+    """
+    Converts an inclusive YYYY-MM-DD date range into half-open timestamp bounds.
+    Comparing the raw ISO timestamps (instead of date(timestamp)) lets SQLite use the index.
+    """
+    try:
+        end_exclusive = (date.fromisoformat(end_date) + timedelta(days=1)).isoformat()
+    except (TypeError, ValueError):
+        end_exclusive = end_date
+    return [start_date, end_exclusive]
+
+def query_daily_minutes(db, start_date, end_date, employee_filter=''):
+    """Fetches worked minutes per employee and day, aggregated by SQLite."""
+    employee = employee_filter or None
+    params = date_range_bounds(start_date, end_date) + [employee, employee]
+    return db.execute(_SQL_DAILY_MINUTES, params).fetchall()
+
 def calculate_entry_exit_pairs(records):
     """
     Calculate entry-exit pairs with quarter-hour logic and carry-over.
-    Returns list of dictionaries with paired entries/exits and accumulated minutes.
+    Expects records ordered by employee, date and time (see _SQL_ORDER_FOR_PAIRS).
+    Returns list of dictionaries with paired entries/exits and accumulated minutes;
+    entry/exit are pre-joined "YYYY-MM-DD HH:MM:SS" strings in entry_datetime/exit_datetime ('-' when missing).
     """
-    from collections import defaultdict
-    
-    # Group records by employee
-    employee_data = defaultdict(list)
-    
-    for record in records:
-        employee_data[record['employee_name']].append(record)
-    
     result = []
     
-    for employee_name, emp_records in employee_data.items():
-        # Sort by timestamp
-        emp_records.sort(key=lambda x: (x['date'], x['time']))
-        
+    # Records arrive grouped by employee, so no intermediate dict is needed
+    for employee_name, emp_records in groupby(records, key=itemgetter('employee_name')):
         accumulated_minutes = 0  # Running total for quarter-hour logic
-        i = 0
         
-        # Process each Enter record and look for matching Exit on the same day
-        processed_exits = set()  # Track which exit records we've already used
-        
-        for i, record in enumerate(emp_records):
-            if record['status'] == 'Enter':
-                entry_record = record
-                exit_record = None
+        # Single pass per day: each Leave closes the oldest Enter still waiting for an exit
+        for _, day_records in groupby(emp_records, key=itemgetter('date')):
+            pending_entries = deque()
+            
+            for record in day_records:
+                if record['status'] == 'Enter':
+                    pending_entries.append(record)
+                    continue
+                if record['status'] != 'Leave' or not pending_entries:
+                    continue
+                
+                entry_record = pending_entries.popleft()
+                exit_record = record
+                
+                # Calculate worked minutes. Entry and exit share a date and times are
+                # always "HH:MM:SS", so slicing replaces the much slower strptime.
+                entry_time = entry_record['time']
+                exit_time = exit_record['time']
+                entry_seconds = int(entry_time[0:2]) * 3600 + int(entry_time[3:5]) * 60 + int(entry_time[6:8])
+                exit_seconds = int(exit_time[0:2]) * 3600 + int(exit_time[3:5]) * 60 + int(exit_time[6:8])
+                
+                worked_minutes = (exit_seconds - entry_seconds) // 60
+                
+                # Apply quarter-hour logic with accumulation
+                total_minutes = worked_minutes + accumulated_minutes
                 
-                # Look for matching exit on the same day that hasn't been used yet
-                for j in range(i + 1, len(emp_records)):
-                    if (emp_records[j]['status'] == 'Leave' and 
-                        emp_records[j]['date'] == entry_record['date'] and
-                        j not in processed_exits):
-                        exit_record = emp_records[j]
-                        processed_exits.add(j)  # Mark this exit as used
-                        break
-                    elif emp_records[j]['date'] != entry_record['date']:
-                        # Different date - stop looking for exits on this day
-                        break
+                # Round to nearest quarter, remainders up to 7 round down; ensure non-negative
+                rounded_minutes = max(0, ((total_minutes + 7) // 15) * 15)
                 
-                if exit_record:
-                    # Calculate worked minutes
-                    entry_time = datetime.strptime(f"{entry_record['date']} {entry_record['time']}", '%Y-%m-%d %H:%M:%S')
-                    exit_time = datetime.strptime(f"{exit_record['date']} {exit_record['time']}", '%Y-%m-%d %H:%M:%S')
-                    
-                    worked_minutes = int((exit_time - entry_time).total_seconds() / 60)
-                    
-                    # Apply quarter-hour logic with accumulation
-                    total_minutes = worked_minutes + accumulated_minutes
-                    
-                    # Round to nearest quarter
-                    remainder = total_minutes % 15
-                    if remainder <= 7:
-                        rounded_minutes = total_minutes - remainder
-                    else:
-                        rounded_minutes = total_minutes + (15 - remainder)
-                    
-                    # Ensure non-negative
-                    rounded_minutes = max(0, rounded_minutes)
-                    
-                    # Update accumulated difference for next pair
-                    accumulated_minutes = total_minutes - rounded_minutes
-                    
-                    # Format hours
-                    actual_hours = worked_minutes // 60
-                    actual_mins = worked_minutes % 60
-                    actual_time_str = f"{actual_hours}:{actual_mins:02d}"
-                    
-                    quarter_hours = rounded_minutes // 60
-                    quarter_mins = rounded_minutes % 60
-                    quarter_time_str = f"{quarter_hours}:{quarter_mins:02d}"
-                    
-                    result.append({
-                        'employee_name': employee_name,
-                        'entry_date': entry_record['date'],
-                        'entry_time': entry_record['time'],
-                        'exit_date': exit_record['date'],
-                        'exit_time': exit_record['time'],
-                        'actual_hours': actual_time_str,
-                        'quarter_hours': quarter_time_str,
-                        'carry_over_minutes': accumulated_minutes
-                    })
-                else:
-                    # No matching exit found - show entry with missing exit
-                    result.append({
-                        'employee_name': employee_name,
-                        'entry_date': entry_record['date'],
-                        'entry_time': entry_record['time'],
-                        'exit_date': '-',
-                        'exit_time': '-',
-                        'actual_hours': '-',
-                        'quarter_hours': '-',
-                        'carry_over_minutes': accumulated_minutes
-                    })
+                # Update accumulated difference for next pair
+                accumulated_minutes = total_minutes - rounded_minutes
+                
+                # Format hours
+                actual_hours = worked_minutes // 60
+                actual_mins = worked_minutes % 60
+                actual_time_str = f"{actual_hours}:{actual_mins:02d}"
+                
+                quarter_hours = rounded_minutes // 60
+                quarter_mins = rounded_minutes % 60
+                quarter_time_str = f"{quarter_hours}:{quarter_mins:02d}"
+                
+                result.append({
+                    'employee_name': employee_name,
+                    'entry_datetime': f"{entry_record['date']} {entry_record['time']}",
+                    'exit_datetime': f"{exit_record['date']} {exit_record['time']}",
+                    'actual_hours': actual_time_str,
+                    'quarter_hours': quarter_time_str,
+                    'carry_over_minutes': accumulated_minutes
+                })
+            
+            # No matching exit found on this day - show entries with missing exit
+            for entry_record in pending_entries:
+                result.append({
+                    'employee_name': employee_name,
+                    'entry_datetime': f"{entry_record['date']} {entry_record['time']}",
+                    'exit_datetime': '-',
+                    'actual_hours': '-',
+                    'quarter_hours': '-',
+                    'carry_over_minutes': accumulated_minutes
+                })
     
     return result
 
-def calculate_daily_hours_with_quarters(records):
+def accumulate_quarter_minutes(daily_minutes):
     """
-    Calculate daily worked hours with quarter-hour rounding logic.
-    Returns list of dictionaries with employee data including quarter-hour adjustments.
+    Apply quarter-hour rounding with carry-over to one employee's daily worked minutes.
+    Every day but the last is rounded to the nearest quarter and the difference is carried
+    to the next day; the last day absorbs the remaining difference without rounding.
     """
-    from collections import defaultdict
+    quarter_minutes = []
+    accumulated_minutes = 0  # Running total of minute differences
     
-    # Group records by employee
-    employee_data = defaultdict(list)
+    for total_minutes in daily_minutes[:-1]:
+        adjusted_minutes = total_minutes + accumulated_minutes
+        # Round to nearest quarter (0, 15, 30, 45), remainders up to 7 round down; ensure non-negative
+        rounded_minutes = max(0, ((adjusted_minutes + 7) // 15) * 15)
+        accumulated_minutes = adjusted_minutes - rounded_minutes
+        quarter_minutes.append(rounded_minutes)
     
-    for record in records:
-        employee_data[record['employee_name']].append(record)
+    if daily_minutes:
+        quarter_minutes.append(max(0, daily_minutes[-1] + accumulated_minutes))
     
-    # Calculate hours for each employee
+    return quarter_minutes
+
+def calculate_daily_hours_with_quarters(daily_totals):
+    """
+    Calculate daily worked hours with quarter-hour rounding logic.
+    Expects rows with employee_name, date and total_minutes ordered by employee and date,
+    as returned by query_daily_minutes().
+    Returns list of dictionaries with employee data including quarter-hour adjustments.
+    """
     result = []
     
-    for employee_name, emp_records in employee_data.items():
-        # Group by date for this employee
-        daily_records = defaultdict(list)
-        for record in emp_records:
-            daily_records[record['date']].append(record)
-        
-        # Sort dates to process in chronological order
-        sorted_dates = sorted(daily_records.keys())
-        accumulated_minutes = 0  # Running total of minute differences
+    # Apply quarter-hour logic per employee, rows are already grouped by the query
+    for employee_name, emp_days in groupby(daily_totals, key=itemgetter('employee_name')):
+        emp_days = list(emp_days)
+        quarter_minutes = accumulate_quarter_minutes([day['total_minutes'] for day in emp_days])
         
-        for i, date in enumerate(sorted_dates):
-            day_records = daily_records[date]
-            day_records.sort(key=lambda x: x['time'])
-            
-            # Calculate worked hours for this day
-            total_minutes = 0
-            enter_time = None
-            
-            for record in day_records:
-                time_obj = datetime.strptime(record['time'], '%H:%M:%S').time()
-                minutes_since_midnight = time_obj.hour * 60 + time_obj.minute
-                
-                if record['status'] == 'Enter':
-                    enter_time = minutes_since_midnight
-                elif record['status'] == 'Leave' and enter_time is not None:
-                    total_minutes += minutes_since_midnight - enter_time
-                    enter_time = None
-            
-            # Convert to hours and minutes
-            hours = total_minutes // 60
-            minutes = total_minutes % 60
-            actual_hours = f"{hours}:{minutes:02d}"
-            
-            # Apply quarter-hour logic
-            is_last_day = (i == len(sorted_dates) - 1)
-            
-            if is_last_day:
-                # Last day - apply accumulated difference but don't round
-                final_minutes = total_minutes + accumulated_minutes
-                # Ensure non-negative result
-                final_minutes = max(0, final_minutes)
-                final_hours = final_minutes // 60
-                final_mins = final_minutes % 60
-                quarter_hours = f"{final_hours}:{final_mins:02d}"
-            else:
-                # Not last day - round to nearest quarter
-                adjusted_minutes = total_minutes + accumulated_minutes
-                
-                # Round to nearest quarter (0, 15, 30, 45)
-                remainder = adjusted_minutes % 15
-                if remainder <= 7:
-                    rounded_minutes = adjusted_minutes - remainder
-                else:
-                    rounded_minutes = adjusted_minutes + (15 - remainder)
-                
-                # Ensure non-negative
-                rounded_minutes = max(0, rounded_minutes)
-                
-                # Update accumulated difference for next day
-                accumulated_minutes = adjusted_minutes - rounded_minutes
-                
-                # Format quarter hours
-                q_hours = rounded_minutes // 60
-                q_mins = rounded_minutes % 60
-                quarter_hours = f"{q_hours}:{q_mins:02d}"
-            
+        for day, rounded_minutes in zip(emp_days, quarter_minutes):
+            total_minutes = day['total_minutes']
             result.append({
                 'employee_name': employee_name,
-                'date': date,
-                'actual_hours': actual_hours,
-                'quarter_hours': quarter_hours
+                'date': day['date'],
+                'actual_hours': f"{total_minutes // 60}:{total_minutes % 60:02d}",
+                'quarter_hours': f"{rounded_minutes // 60}:{rounded_minutes % 60:02d}"
             })
     
-    # Sort by employee name, then by date
-    result.sort(key=lambda x: (x['employee_name'], x['date']))
     return result
 
+# --- Report Cache ---
+# Computed daily hours are cached per filter for a short time. Every write to
+# attendance or employees bumps the version, so stale entries are never served
+# by this process; the TTL bounds staleness across worker processes.
+
+DAILY_HOURS_CACHE_TTL = 60  # seconds
+DAILY_HOURS_CACHE_SIZE = 64
+_daily_hours_cache = {}
+_daily_hours_cache_lock = threading.Lock()
+_attendance_version = 0
+
+def bump_attendance_version():
+    """Invalidates cached reports after attendance or employee data changed."""
+    global _attendance_version
+    with _daily_hours_cache_lock:
+        _attendance_version += 1
+        _daily_hours_cache.clear()
+
+def get_daily_hours(db, start_date, end_date, employee_filter=''):
+    """Returns daily hours with quarter-hour logic for the filter, served from cache when possible."""
+    key = (_attendance_version, start_date, end_date, employee_filter)
+    now = time.monotonic()
+    
+    with _daily_hours_cache_lock:
+        entry = _daily_hours_cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+    
+    result = calculate_daily_hours_with_quarters(
+        query_daily_minutes(db, start_date, end_date, employee_filter)
+    )
+    
+    with _daily_hours_cache_lock:
+        if len(_daily_hours_cache) >= DAILY_HOURS_CACHE_SIZE:
+            _daily_hours_cache.clear()
+        _daily_hours_cache[key] = (now + DAILY_HOURS_CACHE_TTL, result)
+    
+    return result
+
+# --- Employee List Cache ---
+# The employee list (and the home page rendered from it) only changes when
+# employees are added or toggled. Those writes bump the version; the TTL bounds
+# staleness across worker processes.
+
+EMPLOYEES_CACHE_TTL = 60  # seconds
+_employees_cache = None  # (version, expires at, rows)
+_home_page_cache = {}
+_home_page_cache_lock = threading.Lock()
+_employees_version = 0
+
+def bump_employees_version():
+    """Invalidates the cached employee list and home page after employees changed."""
+    global _employees_version, _employees_cache
+    with _home_page_cache_lock:
+        _employees_version += 1
+        _employees_cache = None
+        _home_page_cache.clear()
+
+def get_employees():
+    """Returns all employees (id, name, is_active) ordered by name, cached until they change."""
+    global _employees_cache
+    version = _employees_version
+    now = time.monotonic()
+    
+    cached = _employees_cache
+    if cached is not None and cached[0] == version and cached[1] > now:
+        return cached[2]
+    
+    employees = get_db().execute(_SQL_ALL_EMPLOYEES).fetchall()
+    
+    with _home_page_cache_lock:
+        _employees_cache = (version, now + EMPLOYEES_CACHE_TTL, employees)
+    
+    return employees
+
+# Process-wide SQLite connections, reused across requests instead of opening a
+# new connection (and re-reading the schema) on every hit. Reads lease one of
+# several read-only connections; all writes go through a single writer
+# connection, serialized by a lock, which is what SQLite allows anyway.
+DB_READ_POOL_SIZE = os.cpu_count() or 4
+_db_read_pool = queue.LifoQueue(maxsize=DB_READ_POOL_SIZE)
+_db_writer = None
+_db_writer_lock = threading.Lock()
+
+# The journal mode is stored in the database file itself, so only the writer sets it;
+# a read-only connection cannot switch a rollback-journal database to WAL
+DB_WRITER_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+]
+
+# Applied once per physical connection when it is created
+DB_SESSION_PRAGMAS = [
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA foreign_keys=ON',
+]
+
+def _connect_db(read_only=False):
+    """Opens a new physical database connection, read-only if requested."""
+    if read_only:
+        database = Path(DATABASE).resolve().as_uri() + '?mode=ro'
+    else:
+        database = DATABASE
+    # No detect_types: every column is INTEGER/TEXT and timestamps are read as ISO strings,
+    # so declared-type converters would only add per-value overhead
+    db = sqlite3.connect(database, check_same_thread=False, uri=read_only)
+    # Using a Row factory makes it easier to work with results (access columns by name)
+    db.row_factory = sqlite3.Row
+    try:
+        for pragma in DB_SESSION_PRAGMAS if read_only else DB_WRITER_PRAGMAS + DB_SESSION_PRAGMAS:
+            db.execute(pragma)
+    except sqlite3.Error:
+        db.close()
+        raise
+    return db
+
 def get_db():
-    """Opens a new database connection if there is none yet for the current application context."""
+    """Leases a read-only database connection from the pool for the current application context."""
     if 'db' not in g:
-        g.db = sqlite3.connect(DATABASE, detect_types=sqlite3.PARSE_DECLTYPES)
-        # Using a Row factory makes it easier to work with results (access columns by name)
-        g.db.row_factory = sqlite3.Row
+        try:
+            g.db = _db_read_pool.get_nowait()
+        except queue.Empty:
+            g.db = _connect_db(read_only=True)
     return g.db
 
+def get_write_db():
+    """Acquires the single writer connection for the rest of the current application context."""
+    global _db_writer
+    if 'write_db' not in g:
+        _db_writer_lock.acquire()
+        if _db_writer is None:
+            try:
+                _db_writer = _connect_db()
+            except Exception:
+                # close_db() only releases the lock once g.write_db is set
+                _db_writer_lock.release()
+                raise
+        g.write_db = _db_writer
+    return g.write_db
+
 @app.teardown_appcontext
 def close_db(exception):
-    """Closes the database again at the end of the request."""
+    """Returns the database connections to the pool at the end of the request."""
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        # Never hand an unfinished transaction to the next request
+        db.rollback()
+        try:
+            _db_read_pool.put_nowait(db)
+        except queue.Full:
+            db.close()
+    
+    write_db = g.pop('write_db', None)
+    if write_db is not None:
+        write_db.rollback()
+        _db_writer_lock.release()
 
 # You will need a one-time function to initialize the database schema
 def init_db():
     """Initializes the database with the required tables."""
     with app.app_context():
-        db = get_db()
+        db = get_write_db()
         with app.open_resource('schema.sql', mode='r') as f:
-            db.cursor().executescript(f.read())
-        db.commit()
+            # Run the whole schema as one transaction (one sync to disk instead of one per statement)
+            db.cursor().executescript('BEGIN;\n' + f.read() + '\nCOMMIT;')
+        bump_employees_version()
     print("Databáze byla inicializována.")
 
+# --- CSV Export ---
+
+CSV_CHUNK_SIZE = 64 * 1024  # characters per streamed piece
+
+class _Echo:
+    """File-like object whose write() returns the written line, so csv.writer returns each formatted row."""
+    def write(self, value):
+        return value
+
+def stream_csv(header, rows, filename):
+    """
+    Streams CSV rows to the client as they are produced instead of building the whole file in memory.
+    `rows` may be a lazy iterable (e.g. over a database cursor); it is consumed while the response is sent.
+    """
+    def generate():
+        writer = csv.writer(_Echo())
+        
+        # Coalesce rows into ~CSV_CHUNK_SIZE pieces so large exports need far fewer WSGI writes
+        chunk = [writer.writerow(header)]
+        size = len(chunk[0])
+        for row in rows:
+            line = writer.writerow(row)
+            chunk.append(line)
+            size += len(line)
+            if size >= CSV_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 # --- Routes ---
 
+@app.before_request
+def bind_request_time():
+    """Computes the current time once per request, along with today's timestamp bounds."""
+    now = datetime.now(TIMEZONE)
+    g.now = now
+    g.today = now.date()
+    g.today_iso = g.today.isoformat()
+    g.tomorrow_iso = (g.today + timedelta(days=1)).isoformat()
+
 @app.route('/login', methods=['GET', 'POST'])
 def login_page():
     """Login page with form authentication."""
@@ -401,7 +694,7 @@ def login_page():
         remember_me = request.form.get('remember_me') == '1'
         
         # Verify credentials
-        if username == USERNAME and password == PASSWORD:
+        if verify_password(username, password):
             # Create auth token
             token = create_auth_token()
             
@@ -429,6 +722,10 @@ def login_page():
 @app.route('/logout')
 def logout():
     """Logout route - clears the auth token cookie."""
+    auth_token = request.cookies.get('auth_token')
+    if auth_token:
+        forget_auth_token(auth_token)
+    
     response = make_response(redirect(url_for('login_page')))
     response.set_cookie('auth_token', '', expires=0)
     return response
@@ -448,13 +745,31 @@ def home():
     """
     Home Page: Displays a list of active employees.
     """
-    db = get_db()
-    # Fetch all ACTIVE employees from the database
-    employees = db.execute(
-        'SELECT id, name FROM employees WHERE is_active = 1 ORDER BY name'
-    ).fetchall()
+    key = _employees_version
+    now = time.monotonic()
+    
+    with _home_page_cache_lock:
+        entry = _home_page_cache.get(key)
     
-    return render_template('home.html', employees=employees, current_user=USERNAME)
+    if entry is None or entry[0] <= now:
+        # Only ACTIVE employees are listed
+        employees = [employee for employee in get_employees() if employee['is_active']]
+        
+        html = render_template('home.html', employees=employees, current_user=USERNAME)
+        # Content-based ETag stays valid across restarts and worker processes
+        etag = hashlib.sha1(html.encode()).hexdigest()
+        entry = (now + EMPLOYEES_CACHE_TTL, html, etag)
+        
+        with _home_page_cache_lock:
+            _home_page_cache.clear()
+            _home_page_cache[key] = entry
+    
+    # Answer with 304 Not Modified when the client already has this list
+    response = make_response(entry[1])
+    response.set_etag(entry[2], weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/action/<string:employee_name>')
 @login_required
@@ -464,24 +779,14 @@ def action_page(employee_name):
     """
     db = get_db()
     
-    # Get employee ID and verify the employee exists and is active
-    employee = db.execute(
-        'SELECT id, name FROM employees WHERE name = ? AND is_active = 1', 
-        (employee_name,)
-    ).fetchone()
+    # Verify the employee exists and is active and fetch their last status today in one query
+    employee = db.execute(_SQL_EMPLOYEE_LAST_STATUS, (g.today_iso, g.tomorrow_iso, employee_name)).fetchone()
     
     if not employee:
         return redirect(url_for('home'))
     
-    # Check the last status of this employee today
-    today = datetime.now(TIMEZONE).date()
-    last_record = db.execute(
-        'SELECT status FROM attendance WHERE employee_id = ? AND date(timestamp) = ? ORDER BY timestamp DESC LIMIT 1',
-        (employee['id'], today)
-    ).fetchone()
-    
     # Determine next action
-    if last_record is None or last_record['status'] == 'Leave':
+    if employee['last_status'] is None or employee['last_status'] == 'Leave':
         next_action = 'Enter'
     else:
         next_action = 'Leave'
@@ -496,37 +801,31 @@ def record_action(employee_name):
     """
     Records the attendance action (Enter/Leave) for an employee.
     """
-    db = get_db()
-    
-    # Get employee ID
-    employee = db.execute(
-        'SELECT id FROM employees WHERE name = ? AND is_active = 1', 
-        (employee_name,)
-    ).fetchone()
-    
-    if not employee:
-        return redirect(url_for('home'))
+    db = get_write_db()
     
     action = request.form.get('action')
     if action not in ['Enter', 'Leave']:
         return redirect(url_for('action_page', employee_name=employee_name))
     
     # Record the action with Prague timezone
-    now = datetime.now(TIMEZONE)
+    now = g.now
     timestamp = now.isoformat()
     
-    db.execute(
-        'INSERT INTO attendance (employee_id, status, timestamp) VALUES (?, ?, ?)',
-        (employee['id'], action, timestamp)
-    )
+    # Nothing is inserted if the employee does not exist or is disabled
+    db.execute('BEGIN IMMEDIATE')
+    cursor = db.execute(_SQL_INSERT_ATTENDANCE, (action, timestamp, employee_name))
     db.commit()
+    bump_attendance_version()
+    
+    if cursor.rowcount == 0:
+        return redirect(url_for('home'))
     
     # Send Telegram notification if configured
     telegram_action = "in" if action == "Enter" else "out"
     send_telegram_notification(
         employee_name,
         telegram_action,
-        {'date': now.strftime('%Y-%m-%d'), 'time': now.strftime('%H:%M:%S')}
+        {'date': now.date().isoformat(), 'time': now.time().isoformat('seconds')}
     )
     
     # Redirect back to home page after successful action
@@ -549,48 +848,42 @@ def admin_page():
     show_entry_exit_pairs = view_type == 'entry_exit_pairs'
     message = request.args.get('message')
     
-    # Default to previous month if no dates provided
-    if not start_date or not end_date:
-        today = datetime.now(TIMEZONE).date()
+    # Parse dates once; default to previous month if missing or invalid
+    try:
+        start_date = date.fromisoformat(start_date).isoformat()
+        end_date = date.fromisoformat(end_date).isoformat()
+    except (TypeError, ValueError):
+        today = g.today
         # Get first day of previous month
         first_of_current_month = today.replace(day=1)
         last_month = first_of_current_month - timedelta(days=1)
-        start_date = last_month.replace(day=1).strftime('%Y-%m-%d')
-        end_date = last_month.strftime('%Y-%m-%d')
-    
-    # Fetch attendance records with filters
-    query = '''
-        SELECT e.name as employee_name, a.status, 
-               date(a.timestamp) as date, 
-               time(a.timestamp) as time
-        FROM attendance a 
-        JOIN employees e ON a.employee_id = e.id 
-        WHERE date(a.timestamp) >= ? AND date(a.timestamp) <= ?
-    '''
-    params = [start_date, end_date]
+        start_date = last_month.replace(day=1).isoformat()
+        end_date = last_month.isoformat()
+    
+    # Attendance records with filters
+    query = _SQL_ATTENDANCE_REPORT
+    params = date_range_bounds(start_date, end_date)
     
     if employee_filter:
         query += ' AND e.name = ?'
         params.append(employee_filter)
     
-    query += ' ORDER BY a.timestamp DESC'
-    
-    attendance_records = db.execute(query, params).fetchall()
-    
-    # Calculate daily hours data if requested
+    attendance_records = None
     daily_hours_data = None
-    if show_daily_hours and attendance_records:
-        daily_hours_data = calculate_daily_hours_with_quarters(attendance_records)
-    
-    # Calculate entry-exit pairs if requested
     pairs_data = None
-    if show_entry_exit_pairs and attendance_records:
-        pairs_data = calculate_entry_exit_pairs(attendance_records)
+    
+    if show_daily_hours:
+        # Calculate daily hours data
+        daily_hours_data = get_daily_hours(db, start_date, end_date, employee_filter)
+    elif show_entry_exit_pairs:
+        # Calculate entry-exit pairs from records already ordered for pairing
+        pairs_data = calculate_entry_exit_pairs(db.execute(query + _SQL_ORDER_FOR_PAIRS, params))
+    else:
+        # Basic listing, newest first
+        attendance_records = db.execute(query + ' ORDER BY a.timestamp DESC', params).fetchall()
     
     # Fetch all employees for management and filter dropdown
-    all_employees = db.execute(
-        'SELECT id, name, is_active FROM employees ORDER BY name'
-    ).fetchall()
+    all_employees = get_employees()
     
     return render_template('admin.html',
                          attendance_records=attendance_records,
@@ -611,24 +904,28 @@ def add_employee():
     """
     Adds a new employee to the database.
     """
-    db = get_db()
+    db = get_write_db()
     employee_name = request.form.get('employee_name', '').strip()
     
     if not employee_name:
         return redirect(url_for('admin_page'))
     
     try:
+        db.execute('BEGIN IMMEDIATE')
         db.execute(
             'INSERT INTO employees (name, is_active) VALUES (?, 1)',
             (employee_name,)
         )
         db.commit()
+        bump_attendance_version()
+        bump_employees_version()
         message = f"Zaměstnanec '{employee_name}' byl úspěšně přidán!"
     except sqlite3.IntegrityError:
+        db.rollback()
         message = f"Zaměstnanec '{employee_name}' již existuje!"
     
     # Redirect back to admin with message
-    return redirect(url_for('admin_page') + f'?message={message}')
+    return redirect(url_for('admin_page', message=message))
 
 @app.route('/toggle_employee/<int:employee_id>', methods=['POST'])
 @login_required
@@ -636,7 +933,7 @@ def toggle_employee(employee_id):
     """
     Toggles employee active/inactive status.
     """
-    db = get_db()
+    db = get_write_db()
     action = request.form.get('action')
     
     if action == 'disable':
@@ -648,7 +945,8 @@ def toggle_employee(employee_id):
     else:
         return redirect(url_for('admin_page'))
     
-    # Get employee name for message
+    # Get employee name for message, inside the write transaction
+    db.execute('BEGIN IMMEDIATE')
     employee = db.execute('SELECT name FROM employees WHERE id = ?', (employee_id,)).fetchone()
     
     if employee:
@@ -657,11 +955,14 @@ def toggle_employee(employee_id):
             (new_status, employee_id)
         )
         db.commit()
+        bump_attendance_version()
+        bump_employees_version()
         message = f"Zaměstnanec '{employee['name']}' byl úspěšně {status_text}!"
     else:
+        db.rollback()
         message = "Zaměstnanec nebyl nalezen!"
     
-    return redirect(url_for('admin_page') + f'?message={message}')
+    return redirect(url_for('admin_page', message=message))
 
 @app.route('/export_csv')
 @login_required
@@ -677,15 +978,8 @@ def export_csv():
     employee_filter = request.args.get('employee_filter', '')
     
     # Build query with same logic as admin page
-    query = '''
-        SELECT e.name as employee_name, a.status, 
-               date(a.timestamp) as date, 
-               time(a.timestamp) as time
-        FROM attendance a 
-        JOIN employees e ON a.employee_id = e.id 
-        WHERE date(a.timestamp) >= ? AND date(a.timestamp) <= ?
-    '''
-    params = [start_date, end_date]
+    query = _SQL_ATTENDANCE_REPORT
+    params = date_range_bounds(start_date, end_date)
     
     if employee_filter:
         query += ' AND e.name = ?'
@@ -693,26 +987,22 @@ def export_csv():
     
     query += ' ORDER BY a.timestamp'
     
-    records = db.execute(query, params).fetchall()
-    
-    # Create CSV content
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['Jméno zaměstnance', 'Stav (Příchod/Odchod)', 'Datum', 'Čas'])
+    # Plain tuples (no sqlite3.Row per record), read from the cursor while the response streams
+    cursor = db.cursor()
+    cursor.row_factory = None
+    cursor.execute(query, params)
     
-    # Write data
-    for record in records:
-        status_czech = 'Příchod' if record['status'] == 'Enter' else 'Odchod'
-        writer.writerow([record['employee_name'], status_czech, record['date'], record['time']])
-    
-    # Create response
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=dochazka_report_{start_date}_do_{end_date}.csv'
+    # Columns follow the SELECT order: employee_name, status, date, time
+    rows = (
+        (name, 'Příchod' if status == 'Enter' else 'Odchod', day, time_of_day)
+        for name, status, day, time_of_day in cursor
+    )
     
-    return response
+    return stream_csv(
+        ['Jméno zaměstnance', 'Stav (Příchod/Odchod)', 'Datum', 'Čas'],
+        rows,
+        f'dochazka_report_{start_date}_do_{end_date}.csv'
+    )
 
 @app.route('/export_quarters_csv')
 @login_required
@@ -727,50 +1017,19 @@ def export_quarters_csv():
     end_date = request.args.get('end_date')
     employee_filter = request.args.get('employee_filter', '')
     
-    # Build query to get attendance records
-    query = '''
-        SELECT e.name as employee_name, a.status, 
-               date(a.timestamp) as date, 
-               time(a.timestamp) as time
-        FROM attendance a 
-        JOIN employees e ON a.employee_id = e.id 
-        WHERE date(a.timestamp) >= ? AND date(a.timestamp) <= ?
-    '''
-    params = [start_date, end_date]
-    
-    if employee_filter:
-        query += ' AND e.name = ?'
-        params.append(employee_filter)
-    
-    query += ' ORDER BY e.name, a.timestamp'
+    # Calculate daily hours with quarter-hour logic (shared with the admin page view)
+    daily_hours = get_daily_hours(db, start_date, end_date, employee_filter)
     
-    records = db.execute(query, params).fetchall()
-    
-    # Calculate daily hours with quarter-hour logic
-    daily_hours = calculate_daily_hours_with_quarters(records)
-    
-    # Create CSV content
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['Jméno', 'Datum', 'Počet odpracovaných hodin', 'Počet na čtvrthodiny'])
-    
-    # Write data
-    for record in daily_hours:
-        writer.writerow([
-            record['employee_name'], 
-            record['date'], 
-            record['actual_hours'], 
-            record['quarter_hours']
-        ])
-    
-    # Create response
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=dochazka_ctvrthod_{start_date}_do_{end_date}.csv'
+    rows = (
+        [record['employee_name'], record['date'], record['actual_hours'], record['quarter_hours']]
+        for record in daily_hours
+    )
     
-    return response
+    return stream_csv(
+        ['Jméno', 'Datum', 'Počet odpracovaných hodin', 'Počet na čtvrthodiny'],
+        rows,
+        f'dochazka_ctvrthod_{start_date}_do_{end_date}.csv'
+    )
 
 @app.route('/export_pairs_csv')
 @login_required
@@ -786,70 +1045,42 @@ def export_pairs_csv():
     employee_filter = request.args.get('employee_filter', '')
     
     # Build query to get attendance records
-    query = '''
-        SELECT e.name as employee_name, a.status, 
-               date(a.timestamp) as date, 
-               time(a.timestamp) as time
-        FROM attendance a 
-        JOIN employees e ON a.employee_id = e.id 
-        WHERE date(a.timestamp) >= ? AND date(a.timestamp) <= ?
-    '''
-    params = [start_date, end_date]
+    query = _SQL_ATTENDANCE_REPORT
+    params = date_range_bounds(start_date, end_date)
     
     if employee_filter:
         query += ' AND e.name = ?'
         params.append(employee_filter)
     
-    query += ' ORDER BY e.name, a.timestamp'
-    
-    records = db.execute(query, params).fetchall()
-    
-    # Calculate entry-exit pairs
-    pairs = calculate_entry_exit_pairs(records)
+    query += _SQL_ORDER_FOR_PAIRS
     
-    # Create CSV content
-    output = io.StringIO()
-    writer = csv.writer(output)
+    # Calculate entry-exit pairs straight from the cursor, without fetchall()
+    pairs = calculate_entry_exit_pairs(db.execute(query, params))
     
-    # Write header
-    writer.writerow([
-        'Jméno', 
-        'Datum a čas příchodu', 
-        'Datum a čas odchodu', 
-        'Přesný počet hodin', 
-        'Přenos minut do dalšího',
-        'Počet hodin na čtvrthodiny',
-    ])
-    
-    # Write data
-    for pair in pairs:
-        # Format entry datetime
-        if pair['entry_date'] != '-' and pair['entry_time'] != '-':
-            entry_datetime = f"{pair['entry_date']} {pair['entry_time']}"
-        else:
-            entry_datetime = '-'
-        
-        # Format exit datetime
-        if pair['exit_date'] != '-' and pair['exit_time'] != '-':
-            exit_datetime = f"{pair['exit_date']} {pair['exit_time']}"
-        else:
-            exit_datetime = '-'
-        
-        writer.writerow([
+    rows = (
+        (
             pair['employee_name'],
-            entry_datetime,
-            exit_datetime,
+            pair['entry_datetime'],
+            pair['exit_datetime'],
             pair['actual_hours'],
-            f"{pair['carry_over_minutes']} min" if pair['carry_over_minutes'] != 0 else "0 min",
+            f"{pair['carry_over_minutes']} min",
             pair['quarter_hours'],
-        ])
-    
-    # Create response
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=dochazka_pary_{start_date}_do_{end_date}.csv'
+        )
+        for pair in pairs
+    )
     
-    return response
+    return stream_csv(
+        [
+            'Jméno', 
+            'Datum a čas příchodu', 
+            'Datum a čas odchodu', 
+            'Přesný počet hodin', 
+            'Přenos minut do dalšího',
+            'Počet hodin na čtvrthodiny',
+        ],
+        rows,
+        f'dochazka_pary_{start_date}_do_{end_date}.csv'
+    )
 
 # --- Main Execution ---
 
@@ -858,8 +1089,8 @@ if __name__ == '__main__':
     is_production = os.getenv('FLASK_ENV') == 'production'
     
     if is_production:
-        # Production settings for Docker - use environment variables for host/port
-        app.run(host=APP_HOST, port=APP_PORT, debug=False)
+        # Flask's development server is not meant for production; run under gunicorn instead
+        raise RuntimeError("Run via gunicorn in production: gunicorn -c gunicorn.conf.py app:app")
     else:
         # Development settings - use config file settings
         app.run(host=APP_HOST, port=APP_PORT, debug=CONFIG_DEBUG)
@@ -15,4 +15,8 @@ TIMEZONE_NAME = "Europe/Prague"
 DEBUG = True
 SECRET_KEY = "your-secret-key-change-this-in-production"
 PORT = 5000
-HOST = "127.0.0.1"  # Use "0.0.0.0" for Docker or external access
\ No newline at end of file
+HOST = "127.0.0.1"  # Use "0.0.0.0" for Docker or external access
+
+# Telegram notifications (leave empty to disable)
+TELEGRAM_BOT_TOKEN = ""
+TELEGRAM_CHAT_ID = ""
\ No newline at end of file
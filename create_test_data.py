@@ -5,18 +5,22 @@ Vytvoří různé scénáře pro testování exportu párů příchod-odchod.
 """
 
 import sqlite3
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
 
 # Konfigurace
 DATABASE = 'data/attendance.db'
-TIMEZONE = pytz.timezone('Europe/Prague')
+TIMEZONE = ZoneInfo('Europe/Prague')
 
 def create_test_data():
     """Vytvoří testovací data s různými scénáři."""
     
     # Připojení k databázi
     conn = sqlite3.connect(DATABASE)
+    # Stejný režim žurnálu jako aplikace (WAL), commit bez plného fsync
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
     cursor = conn.cursor()
     
     print("Vytvářím testovací data...")
@@ -28,80 +32,79 @@ def create_test_data():
         "Pavel Dvořák"
     ]
     
-    for name in employees:
-        try:
-            cursor.execute('INSERT INTO employees (name, is_active) VALUES (?, 1)', (name,))
-            print(f"✓ Přidán zaměstnanec: {name}")
-        except sqlite3.IntegrityError:
-            print(f"- Zaměstnanec {name} již existuje")
-    
+    # Jediná transakce pro všechny zaměstnance; existující jména přeskočí UNIQUE omezení
+    conn.execute('BEGIN')
+    cursor.executemany('INSERT OR IGNORE INTO employees (name, is_active) VALUES (?, 1)', [(name,) for name in employees])
     conn.commit()
+    skipped = " (ostatní již existují)" if cursor.rowcount < len(employees) else ""
+    print(f"✓ Přidáno zaměstnanců: {cursor.rowcount} z {len(employees)}{skipped}")
     
-    # Získání ID zaměstnanců
-    emp_ids = {}
-    for name in employees:
-        result = cursor.execute('SELECT id FROM employees WHERE name = ?', (name,)).fetchone()
-        if result:
-            emp_ids[name] = result[0]
+    # Získání ID zaměstnanců jediným dotazem
+    placeholders = ','.join('?' * len(employees))
+    rows = cursor.execute(f'SELECT name, id FROM employees WHERE name IN ({placeholders})', employees).fetchall()
+    emp_ids = dict(rows)
     
     # 2. Vytvoření testovacích záznamů docházky
     base_date = datetime.now(TIMEZONE).date() - timedelta(days=7)  # Před týdnem
     
+    def ts(day_offset, hour, minute):
+        """Časová značka 'YYYY-MM-DD HH:MM:SS' pro daný den od base_date."""
+        return datetime.combine(base_date + timedelta(days=day_offset), time(hour, minute)).isoformat(sep=' ')
+    
     # Scénář 1: Jan Novák - normální pracovní dny s různými časy
     jan_id = emp_ids["Jan Novák"]
     test_records = [
         # Den 1: 8:05 - 16:25 (8:20 hodin, má se zaokrouhlit na 8:15)
-        (jan_id, 'Enter', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 08:05:00'),
-        (jan_id, 'Leave', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 16:25:00'),
+        (jan_id, 'Enter', ts(0, 8, 5)),
+        (jan_id, 'Leave', ts(0, 16, 25)),
         
         # Den 2: 7:58 - 16:12 (8:14 hodin, má se zaokrouhlit na 8:15 s přenosem z předchozího dne)
-        (jan_id, 'Enter', (base_date + timedelta(days=1)).strftime('%Y-%m-%d') + ' 07:58:00'),
-        (jan_id, 'Leave', (base_date + timedelta(days=1)).strftime('%Y-%m-%d') + ' 16:12:00'),
+        (jan_id, 'Enter', ts(1, 7, 58)),
+        (jan_id, 'Leave', ts(1, 16, 12)),
         
         # Den 3: 8:00 - 16:30 (8:30 hodin)
-        (jan_id, 'Enter', (base_date + timedelta(days=2)).strftime('%Y-%m-%d') + ' 08:00:00'),
-        (jan_id, 'Leave', (base_date + timedelta(days=2)).strftime('%Y-%m-%d') + ' 16:30:00'),
+        (jan_id, 'Enter', ts(2, 8, 0)),
+        (jan_id, 'Leave', ts(2, 16, 30)),
     ]
     
     # Scénář 2: Marie Svobodová - chybějící odchod
     marie_id = emp_ids["Marie Svobodová"]
     test_records.extend([
         # Den 1: Normální den
-        (marie_id, 'Enter', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 08:15:00'),
-        (marie_id, 'Leave', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 16:45:00'),
+        (marie_id, 'Enter', ts(0, 8, 15)),
+        (marie_id, 'Leave', ts(0, 16, 45)),
         
         # Den 2: Chybějící odchod
-        (marie_id, 'Enter', (base_date + timedelta(days=1)).strftime('%Y-%m-%d') + ' 08:10:00'),
+        (marie_id, 'Enter', ts(1, 8, 10)),
         # Žádný odchod!
         
         # Den 3: Další normální den
-        (marie_id, 'Enter', (base_date + timedelta(days=2)).strftime('%Y-%m-%d') + ' 08:00:00'),
-        (marie_id, 'Leave', (base_date + timedelta(days=2)).strftime('%Y-%m-%d') + ' 17:00:00'),
+        (marie_id, 'Enter', ts(2, 8, 0)),
+        (marie_id, 'Leave', ts(2, 17, 0)),
     ])
     
     # Scénář 3: Pavel Dvořák - více příchodů/odchodů v jednom dni (přestávka)
     pavel_id = emp_ids["Pavel Dvořák"]
     test_records.extend([
         # Den 1: S obědovou přestávkou
-        (pavel_id, 'Enter', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 08:00:00'),
-        (pavel_id, 'Leave', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 12:00:00'),  # Odchod na oběd
-        (pavel_id, 'Enter', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 13:00:00'),  # Návrat z oběda
-        (pavel_id, 'Leave', (base_date + timedelta(days=0)).strftime('%Y-%m-%d') + ' 17:00:00'),  # Konec dne
+        (pavel_id, 'Enter', ts(0, 8, 0)),
+        (pavel_id, 'Leave', ts(0, 12, 0)),  # Odchod na oběd
+        (pavel_id, 'Enter', ts(0, 13, 0)),  # Návrat z oběda
+        (pavel_id, 'Leave', ts(0, 17, 0)),  # Konec dne
         
         # Den 2: Krátká práce
-        (pavel_id, 'Enter', (base_date + timedelta(days=1)).strftime('%Y-%m-%d') + ' 09:00:00'),
-        (pavel_id, 'Leave', (base_date + timedelta(days=1)).strftime('%Y-%m-%d') + ' 13:30:00'),  # 4:30 hodin
+        (pavel_id, 'Enter', ts(1, 9, 0)),
+        (pavel_id, 'Leave', ts(1, 13, 30)),  # 4:30 hodin
     ])
     
-    # Vložení všech záznamů
-    for employee_id, status, timestamp in test_records:
-        cursor.execute(
-            'INSERT INTO attendance (employee_id, status, timestamp) VALUES (?, ?, ?)',
-            (employee_id, status, timestamp)
-        )
-        print(f"✓ Přidán záznam: {status} v {timestamp}")
-    
+    # Vložení všech záznamů v jediné transakci
+    conn.execute('BEGIN')
+    cursor.executemany(
+        'INSERT INTO attendance (employee_id, status, timestamp) VALUES (?, ?, ?)',
+        test_records
+    )
     conn.commit()
+    print(f"✓ Přidáno záznamů docházky: {len(test_records)}")
     conn.close()
     
     print(f"\n🎉 Testovací data byla úspěšně vytvořena!")
@@ -7,10 +7,10 @@ Usage: python generate_secret_key.py
 import secrets
 
 if __name__ == "__main__":
-    secret_key = secrets.token_hex(32)
-    print("Generated SECRET_KEY:")
-    print(secret_key)
-    print("\nAdd this to your config.py or .env file:")
-    print(f'SECRET_KEY = "{secret_key}"')
-    print("or")
-    print(f'SECRET_KEY={secret_key}')
\ No newline at end of file
+    # 32 random bytes (256 bits), URL-safe base64 encoded
+    secret_key = secrets.token_urlsafe(32)
+    print(
+        f'Generated SECRET_KEY:\n{secret_key}\n'
+        f'\nAdd this to your config.py or .env file:\n'
+        f'SECRET_KEY = "{secret_key}"\nor\nSECRET_KEY={secret_key}'
+    )
\ No newline at end of file
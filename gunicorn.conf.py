@@ -0,0 +1,25 @@
+# Gunicorn configuration for production (used by the Docker image)
+# Run with: gunicorn -c gunicorn.conf.py app:app
+
+import os
+
+# Listen on the same host/port settings as the application: environment variables
+# first, then config.py, then the application's defaults
+try:
+    from config import HOST as _config_host, PORT as _config_port
+except ImportError:
+    _config_host, _config_port = '127.0.0.1', 5000
+bind = f"{os.getenv('HOST', _config_host)}:{os.getenv('PORT', _config_port)}"
+
+# Threads rather than processes: one process shares the SQLite page cache, the
+# connection pool and the in-process employee/report/token caches between requests,
+# while long CSV exports no longer block other requests
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Streaming exports of large date ranges may take a while
+timeout = 120
+
+accesslog = '-'
+errorlog = '-'
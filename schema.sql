@@ -21,6 +21,20 @@ CREATE TABLE IF NOT EXISTS auth_tokens (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     token_hash TEXT UNIQUE NOT NULL,
     created_at TEXT NOT NULL,
-    expires_at TEXT NOT NULL,
+    expires_at INTEGER NOT NULL, -- Unix epoch seconds
     is_active INTEGER DEFAULT 1
 );
+
+-- Covering index for the latest-status lookup and per-employee range scans
+-- (status is included so neither needs to read the table rows)
+DROP INDEX IF EXISTS ix_attendance_emp_ts;
+CREATE INDEX IF NOT EXISTS ix_attendance_emp_ts_status ON attendance (employee_id, timestamp DESC, status);
+
+-- Index for date-range reports across all employees (admin listing, exports)
+CREATE INDEX IF NOT EXISTS ix_attendance_ts ON attendance (timestamp);
+
+-- Index for looking up active employees by name
+CREATE INDEX IF NOT EXISTS ix_employees_name_active ON employees (name, is_active);
+
+-- Convert expiry times stored as ISO 8601 strings by older versions to Unix epoch seconds
+UPDATE auth_tokens SET expires_at = CAST(strftime('%s', expires_at) AS INTEGER) WHERE expires_at LIKE '%-%';